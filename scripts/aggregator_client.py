@@ -0,0 +1,256 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Deque, Dict, Iterable, List, Optional
+import httpx
+
+log = logging.getLogger("aggregator_client")
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+MAX_RETRY_AFTER = 60.0
+LATENCY_WINDOW = 10000  # recent batch latencies kept for percentiles
+
+class PublishError(Exception):
+    """A batch could not be delivered after all retries."""
+
+    def __init__(self, message: str, batch: List[Dict], cause: Optional[BaseException] = None):
+        super().__init__(message)
+        self.batch = batch
+        self.cause = cause
+
+# client-side counters
+@dataclass
+class ClientStats:
+    events_sent: int = 0
+    batches_sent: int = 0
+    retries: int = 0
+    throttled: int = 0
+    failed_batches: int = 0
+    latencies_ms: Deque[float] = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+
+# nearest-rank percentiles over samples (src/loop_monitor.py keeps a copy)
+def percentiles(samples, ps) -> dict:
+    if not samples:
+        return {p: None for p in ps}
+    s = sorted(samples)
+    res = {}
+    for p in ps:
+        k = max(0, min(len(s) - 1, int(round(p / 100 * (len(s) - 1)))))
+        res[p] = s[k]
+    return res
+
+# format an optional ms value for reports
+def fmt_ms(v: Optional[float]) -> str:
+    return "-" if v is None else f"{v:.1f}"
+
+# Retry-After: delta-seconds or HTTP-date
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        delay = float(value)
+    except ValueError:
+        try:
+            delay = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return max(0.0, min(delay, MAX_RETRY_AFTER))
+
+class AggregatorClient:
+    """Batching async publisher for the aggregator ``/publish`` endpoint.
+
+    Events passed to ``publish`` are buffered and sent once ``batch_size``
+    events are queued or ``linger`` seconds have passed since the first
+    buffered event. At most ``max_in_flight`` batches are on the wire; when
+    all slots are taken ``publish`` waits (also while a linger-triggered batch
+    is waiting for a slot), which pushes back on producers.
+
+    Failed batches are retried with full-jitter exponential backoff. A
+    ``Retry-After`` on 429/503 holds back every send from this client, not
+    just the throttled batch, until the deadline passes. Resending a batch is safe because the
+    aggregator deduplicates on (topic, event_id). Batches that still fail are
+    reported by ``flush``/``close`` as ``PublishError``. If the ``async with``
+    body raises, ``close`` does not flush: buffered and in-flight events are
+    discarded and their count is logged as a warning.
+    """
+
+    def __init__(
+        self,
+        base_url: str = "http://localhost:8080",
+        batch_size: int = 500,
+        linger: float = 0.05,
+        max_in_flight: int = 4,
+        max_retries: int = 5,
+        backoff_base: float = 0.1,
+        backoff_max: float = 5.0,
+        timeout: float = 30.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        if batch_size < 1 or max_in_flight < 1:
+            raise ValueError("batch_size and max_in_flight must be >= 1")
+        self.batch_size = batch_size
+        self.linger = linger
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stats = ClientStats()
+        limits = httpx.Limits(max_connections=max_in_flight, max_keepalive_connections=max_in_flight)
+        self.http = httpx.AsyncClient(
+            base_url=base_url.rstrip("/"), limits=limits, timeout=timeout, transport=transport
+        )
+        self._buffer: List[Dict] = []
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._in_flight: set[asyncio.Task] = set()
+        self._linger_task: Optional[asyncio.Task] = None
+        self._linger_dispatch: Optional[asyncio.Task] = None  # linger batch waiting for a slot
+        self._not_before = 0.0  # monotonic deadline from Retry-After, client-wide
+        self._errors: List[PublishError] = []
+        self._pending_events = 0  # dispatched but not yet settled
+
+    async def __aenter__(self) -> "AggregatorClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close(raise_errors=exc_type is None)
+
+    async def publish(self, event: Dict) -> None:
+        # buffer one event; dispatch when the batch is full
+        if self._linger_dispatch is not None:
+            # a lingered batch is still waiting for a slot: wait with it
+            await asyncio.shield(self._linger_dispatch)
+        self._buffer.append(event)
+        if len(self._buffer) >= self.batch_size:
+            await self._dispatch()
+        elif self._linger_task is None:
+            self._linger_task = asyncio.create_task(self._linger())
+
+    async def publish_many(self, events: Iterable[Dict]) -> None:
+        for ev in events:
+            await self.publish(ev)
+
+    async def flush(self) -> None:
+        # send whatever is buffered and wait for all batches to settle
+        if self._buffer:
+            await self._dispatch()
+        while self._in_flight:
+            await asyncio.gather(*list(self._in_flight), return_exceptions=True)
+        if self._errors:
+            errors, self._errors = self._errors, []
+            raise errors[0] if len(errors) == 1 else PublishError(
+                f"{len(errors)} batches failed; first: {errors[0]}",
+                [ev for e in errors for ev in e.batch],
+                errors[0],
+            )
+
+    async def close(self, raise_errors: bool = True) -> None:
+        try:
+            if raise_errors:
+                await self.flush()
+        finally:
+            dropped = len(self._buffer) + self._pending_events
+            if dropped:
+                log.warning("closing: discarding %d undelivered events (%d buffered, %d in flight)",
+                            dropped, len(self._buffer), self._pending_events)
+            self._buffer = []
+            if self._linger_task is not None:
+                self._linger_task.cancel()
+                self._linger_task = None
+            tasks = list(self._in_flight)
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self.http.aclose()
+
+    async def send_batch(self, batch: List[Dict]) -> Dict:
+        """POST one batch now, retrying transient failures. Returns the response body."""
+        attempt = 0
+        while True:
+            t0 = time.perf_counter()
+            delay: Optional[float] = None
+            while (wait := self._not_before - time.monotonic()) > 0:
+                await asyncio.sleep(wait)
+            try:
+                r = await self.http.post("/publish", json={"events": batch})
+            except httpx.TransportError as e:
+                err: BaseException = e
+            else:
+                if r.status_code < 400:
+                    self.stats.latencies_ms.append((time.perf_counter() - t0) * 1000.0)
+                    self.stats.batches_sent += 1
+                    self.stats.events_sent += len(batch)
+                    try:
+                        return r.json()
+                    except ValueError:
+                        return {}  # accepted; body is informational only
+                if r.status_code not in RETRY_STATUS:
+                    raise PublishError(f"publish rejected: HTTP {r.status_code} {r.text[:200]}", batch)
+                if r.status_code == 429:
+                    self.stats.throttled += 1
+                if r.status_code in (429, 503):
+                    delay = parse_retry_after(r.headers.get("retry-after"))
+                    if delay is not None:
+                        # server asked us to back off: hold every batch, not just this one
+                        self._not_before = max(self._not_before, time.monotonic() + delay)
+                err = httpx.HTTPStatusError(f"HTTP {r.status_code}", request=r.request, response=r)
+
+            if attempt >= self.max_retries:
+                raise PublishError(f"publish failed after {attempt + 1} attempts: {err}", batch, err)
+            if delay is None:
+                # full jitter
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+            attempt += 1
+            self.stats.retries += 1
+            log.warning("retry %d/%d in %.2fs: %s", attempt, self.max_retries, delay, err)
+            await asyncio.sleep(delay)
+
+    async def _linger(self) -> None:
+        await asyncio.sleep(self.linger)
+        self._linger_task = None
+        if self._buffer:
+            # may wait for a slot; flush() sees it as in flight, publish() waits on it
+            task = asyncio.current_task()
+            self._in_flight.add(task)
+            self._linger_dispatch = task
+            try:
+                await self._dispatch()
+            finally:
+                self._in_flight.discard(task)
+                self._linger_dispatch = None
+
+    async def _dispatch(self) -> None:
+        # take the buffer before awaiting so new events start a fresh batch
+        batch, self._buffer = self._buffer, []
+        n = len(batch)
+        self._pending_events += n
+        if self._linger_task is not None and self._linger_task is not asyncio.current_task():
+            self._linger_task.cancel()
+        self._linger_task = None
+        try:
+            await self._slots.acquire()
+        except BaseException:
+            self._pending_events -= n  # cancelled while waiting (close)
+            raise
+
+        # settle in a done callback so it also runs if the task is cancelled before starting
+        def _settled(t: asyncio.Task) -> None:
+            self._in_flight.discard(t)
+            self._pending_events -= n
+            self._slots.release()
+
+        task = asyncio.create_task(self._send(batch))
+        self._in_flight.add(task)
+        task.add_done_callback(_settled)
+
+    async def _send(self, batch: List[Dict]) -> None:
+        try:
+            await self.send_batch(batch)
+        except Exception as e:
+            if not isinstance(e, PublishError):
+                e = PublishError(f"publish failed: {e!r}", batch, e)
+            self.stats.failed_batches += 1
+            self._errors.append(e)
+            log.error("%s", e)
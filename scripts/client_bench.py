@@ -0,0 +1,65 @@
+# Throughput benchmark untuk AggregatorClient (sisi client).
+# Tanpa --server: aggregator disimulasikan in-process (httpx.MockTransport),
+# sehingga yang terukur adalah overhead client: batching, pooling, retry.
+import asyncio
+import argparse
+import json
+import random
+import time
+import httpx
+from aggregator_client import AggregatorClient, fmt_ms, percentiles
+
+def mock_transport(latency_ms: float, throttle_ratio: float) -> httpx.MockTransport:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency_ms / 1000.0)
+        if random.random() < throttle_ratio:
+            return httpx.Response(429, headers={"Retry-After": "0"})
+        n = len(json.loads(request.content)["events"])
+        return httpx.Response(202, json={"enqueued": n})
+    return httpx.MockTransport(handler)
+
+def make_event(topic: str, i: int) -> dict:
+    return {
+        "topic": topic,
+        "event_id": f"bench-{i}",
+        "timestamp": "2025-01-01T00:00:00Z",
+        "source": "client-bench",
+        "payload": {"i": i},
+    }
+
+async def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-s", "--server", default=None, help="aggregator URL; default: mock in-process")
+    ap.add_argument("-n", "--total", type=int, default=100000)
+    ap.add_argument("-b", "--batch-size", type=int, default=500)
+    ap.add_argument("-c", "--in-flight", type=int, default=8)
+    ap.add_argument("-l", "--linger", type=float, default=0.05)
+    ap.add_argument("--latency-ms", type=float, default=5.0, help="mock: server latency per batch")
+    ap.add_argument("--throttle", type=float, default=0.0, help="mock: fraction of 429 responses")
+    ap.add_argument("-t", "--topic", default="client-bench")
+    args = ap.parse_args()
+
+    transport = None if args.server else mock_transport(args.latency_ms, args.throttle)
+    async with AggregatorClient(
+        args.server or "http://mock",
+        batch_size=args.batch_size,
+        linger=args.linger,
+        max_in_flight=args.in_flight,
+        backoff_base=0.01,
+        transport=transport,
+    ) as client:
+        t0 = time.perf_counter()
+        await client.publish_many(make_event(args.topic, i) for i in range(args.total))
+        await client.flush()
+        elapsed = time.perf_counter() - t0
+
+    st = client.stats
+    p = percentiles(st.latencies_ms, [50, 95, 99])
+    print("=== Client Bench ===")
+    print(f"target={'mock' if transport else args.server} total={args.total} batch_size={args.batch_size} in_flight={args.in_flight}")
+    print(f"events_sent={st.events_sent} batches={st.batches_sent} retries={st.retries} throttled={st.throttled} failed={st.failed_batches}")
+    print(f"batch_ms_p50={fmt_ms(p[50])} p95={fmt_ms(p[95])} p99={fmt_ms(p[99])}")
+    print(f"elapsed_sec={elapsed:.3f} throughput_eps≈{st.events_sent / elapsed if elapsed else 0:.1f}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
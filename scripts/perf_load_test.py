@@ -6,6 +6,7 @@ import string
 import time
 from typing import List, Dict
 import httpx
+from aggregator_client import AggregatorClient, fmt_ms, percentiles
 
 def now_iso():
     return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
@@ -32,26 +33,6 @@ def gen_events(total: int, dup_ratio: float, topic: str, run_id: str) -> List[Di
     random.shuffle(events)
     return events
 
-def chunks(lst, n):
-    for i in range(0, len(lst), n):
-        yield lst[i:i+n]
-
-def percentiles(samples, ps):
-    if not samples:
-        return {p: None for p in ps}
-    s = sorted(samples)
-    res = {}
-    for p in ps:
-        k = max(0, min(len(s) - 1, int(round(p/100 * (len(s)-1)))))
-        res[p] = s[k]
-    return res
-
-async def post_batch(client: httpx.AsyncClient, url: str, events: List[Dict]) -> float:
-    t0 = time.perf_counter()
-    r = await client.post(url, json={"events": events}, timeout=15.0)
-    r.raise_for_status()
-    return (time.perf_counter() - t0) * 1000.0
-
 async def ping_health(client: httpx.AsyncClient, url: str, stop: asyncio.Event, samples: List[float]):
     while not stop.is_set():
         t0 = time.perf_counter()
@@ -75,38 +56,33 @@ async def main():
 
     run_id = f"run{int(time.time())}-{rand_str(4)}"
     events = gen_events(args.total, args.dup_ratio, args.topic, run_id)
-    batches = list(chunks(events, args.batch_size))
-
-    publish_url = f"{args.server}/publish"
-    stats_url = f"{args.server}/stats"
-    health_url = f"{args.server}/health"
 
-    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
-    async with httpx.AsyncClient(limits=limits) as client:
+    # health/stats on their own connection so they don't queue behind publish batches
+    async with httpx.AsyncClient(base_url=args.server) as probe, AggregatorClient(
+        args.server,
+        batch_size=args.batch_size,
+        max_in_flight=args.concurrency,
+        timeout=15.0,
+    ) as client:
         stop = asyncio.Event()
         health_samples: List[float] = []
-        health_task = asyncio.create_task(ping_health(client, health_url, stop, health_samples))
-
-        sem = asyncio.Semaphore(args.concurrency)
-        lat_samples: List[float] = []
-
-        async def worker(batch):
-            async with sem:
-                lat = await post_batch(client, publish_url, batch)
-                lat_samples.append(lat)
+        health_task = asyncio.create_task(ping_health(probe, "/health", stop, health_samples))
 
         t0 = time.perf_counter()
-        await asyncio.gather(*(worker(b) for b in batches))
+        try:
+            await client.publish_many(events)
+            await client.flush()
+        finally:
+            stop.set()
+            await health_task
         total_ms = (time.perf_counter() - t0) * 1000.0
 
-        stop.set()
-        await health_task
-
         # ambil stats akhir
-        r = await client.get(stats_url, timeout=10.0)
+        r = await probe.get("/stats", timeout=10.0)
         r.raise_for_status()
         stats = r.json()
 
+    lat_samples = client.stats.latencies_ms
     p_pub = percentiles(lat_samples, [50, 95, 99])
     p_h = percentiles(health_samples, [50, 95, 99])
 
@@ -115,11 +91,11 @@ async def main():
 
     print("=== Perf Summary ===")
     print(f"run_id: {run_id}")
-    print(f"batches={len(batches)} batch_size={args.batch_size} concurrency={args.concurrency}")
+    print(f"batches={client.stats.batches_sent} batch_size={args.batch_size} concurrency={args.concurrency} retries={client.stats.retries}")
     print(f"total_events={args.total} dup_ratio={args.dup_ratio:.2f}")
     print(f"elapsed_ms={total_ms:.1f}")
-    print(f"publish_ms_p50={p_pub[50]:.1f} p95={p_pub[95]:.1f} p99={p_pub[99]:.1f}")
-    print(f"health_ms_p50={p_h[50]:.1f} p95={p_h[95]:.1f} p99={p_h[99]:.1f}")
+    print(f"publish_ms_p50={fmt_ms(p_pub[50])} p95={fmt_ms(p_pub[95])} p99={fmt_ms(p_pub[99])}")
+    print(f"health_ms_p50={fmt_ms(p_h[50])} p95={fmt_ms(p_h[95])} p99={fmt_ms(p_h[99])}")
     print("=== Aggregator Stats ===")
     print(json.dumps(stats, indent=2))
     print("=== Assertions ===")
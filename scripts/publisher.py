@@ -1,6 +1,6 @@
 import asyncio, random, time, argparse, os
-import httpx
 from datetime import datetime, timezone
+from aggregator_client import AggregatorClient
 
 def make_event(topic: str, eid: str, src="bench", payload=None):
     return {
@@ -11,10 +11,11 @@ def make_event(topic: str, eid: str, src="bench", payload=None):
         "payload": payload or {},
     }
 
-async def publish_batch(client: httpx.AsyncClient, url: str, batch):
-    r = await client.post(url, json={"events": batch}, timeout=30.0)
-    r.raise_for_status()
-    return r.json()
+# stream events: first `unique` ids, then random repeats
+def gen_events(topic: str, count: int, unique: int):
+    for i in range(count):
+        eid = f"id{i}" if i < unique else f"id{random.randrange(unique)}"
+        yield make_event(topic, eid)
 
 async def main():
     ap = argparse.ArgumentParser()
@@ -24,34 +25,29 @@ async def main():
     ap.add_argument("--unique", type=int, default=int(os.getenv("UNIQUE", "4000")))  # >=20% dupe: 5k total, 4k unik → 20% dupe
     ap.add_argument("--batch", type=int, default=int(os.getenv("BATCH", "500")))
     ap.add_argument("--concurrency", type=int, default=int(os.getenv("CONC", "4")))
+    ap.add_argument("--linger", type=float, default=float(os.getenv("LINGER", "0.05")))
+    ap.add_argument("--retries", type=int, default=int(os.getenv("RETRIES", "5")))
     args = ap.parse_args()
 
-    assert args.unique <= args.count, "unique must be <= count"
+    assert 0 < args.unique <= args.count, "unique must be in 1..count"
 
-    ids = [f"id{i}" for i in range(args.unique)]
-    events = []
-    for i in range(args.count):
-        if i < args.unique:
-            eid = ids[i]
-        else:
-            eid = random.choice(ids)
-        events.append(make_event(args.topic, eid))
-
-    batches = [events[i:i+args.batch] for i in range(0, len(events), args.batch)]
-
-    sem = asyncio.Semaphore(args.concurrency)
-    async with httpx.AsyncClient() as client:
+    base_url = args.url.removesuffix("/publish")
+    async with AggregatorClient(
+        base_url,
+        batch_size=args.batch,
+        linger=args.linger,
+        max_in_flight=args.concurrency,
+        max_retries=args.retries,
+    ) as client:
         start = time.time()
-        async def worker(batch):
-            async with sem:
-                return await publish_batch(client, args.url, batch)
-
-        await asyncio.gather(*(worker(b) for b in batches))
+        await client.publish_many(gen_events(args.topic, args.count, args.unique))
+        await client.flush()
         elapsed = time.time() - start
 
-        stats = (await client.get(args.url.replace("/publish", "/stats"))).json()
+        stats = (await client.http.get("/stats")).json()
         print("\n=== Benchmark Result ===")
         print(f"sent_total={args.count} unique_target={args.unique}")
+        print(f"batches={client.stats.batches_sent} retries={client.stats.retries} throttled={client.stats.throttled}")
         print(f"received={stats['received']} unique_processed={stats['unique_processed']} dup_dropped={stats['duplicate_dropped']}")
         print(f"elapsed_sec={elapsed:.3f} throughput_eps≈{args.count/elapsed:.1f}")
 
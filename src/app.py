@@ -3,12 +3,14 @@ import logging
 from contextlib import suppress, asynccontextmanager
 from time import monotonic
 
-from fastapi import FastAPI, status, Body
+from fastapi import FastAPI, HTTPException, Query, status, Body
+from fastapi.responses import PlainTextResponse
 
 from .models import PublishRequest
-from .state import app_state, Stats, InMemoryEventStore
+from .state import app_state
 from .dedup_store import DedupStore
 from .consumer import consumer_loop
+from .loop_monitor import LoopMonitor, profile_collapsed, profile_pstats
 from .config import settings as global_settings
 
 logging.basicConfig(
@@ -23,10 +25,7 @@ POLL_INTERVAL = 0.005
 
 # reset in-memory state
 def _reset_state() -> None:
-    app_state.queue = asyncio.Queue()
-    app_state.stats = Stats()
-    app_state.events = InMemoryEventStore()
-    app_state.consumer_tasks = []
+    app_state.reset()
 
 # open dedup store
 async def _ensure_dedup() -> None:
@@ -49,6 +48,20 @@ async def _stop_consumers() -> None:
             await t
     app_state.consumer_tasks.clear()
 
+# start loop lag monitor
+def _start_loop_monitor() -> None:
+    app_state.loop_monitor = LoopMonitor(
+        interval=global_settings.loop_monitor_interval,
+        slow_threshold=global_settings.slow_callback_threshold,
+    )
+    app_state.loop_monitor.start()
+
+# stop loop lag monitor
+async def _stop_loop_monitor() -> None:
+    if app_state.loop_monitor:
+        await app_state.loop_monitor.stop()
+    app_state.loop_monitor = None
+
 # process synchronously
 async def _process_events_sync(events: list[dict]) -> None:
     for ev in events:
@@ -83,10 +96,12 @@ def create_app(dedup_db_path: str | None = None) -> FastAPI:
         _reset_state()
         await _ensure_dedup()
         _start_consumers()
+        _start_loop_monitor()
         log.info("DB=%s", app_state.dedup.db_path if app_state.dedup else "-")
         try:
             yield
         finally:
+            await _stop_loop_monitor()
             await _stop_consumers()
             if app_state.dedup:
                 await app_state.dedup.close()
@@ -120,6 +135,7 @@ def create_app(dedup_db_path: str | None = None) -> FastAPI:
         # build stats
         uptime = monotonic() - app_state.stats.started_at_monotonic
         topics = sorted(app_state.events.events_by_topic.keys())
+        loop = app_state.loop_monitor.snapshot() if app_state.loop_monitor else {}
         return {
             "received": app_state.stats.received,
             "unique_processed": app_state.stats.unique_processed,
@@ -128,6 +144,7 @@ def create_app(dedup_db_path: str | None = None) -> FastAPI:
             "topics": list(topics),
             "uptime_seconds": round(uptime, 3),
             "queue_size": app_state.queue.qsize(),
+            **loop,
         }
 
     @app.get("/events")
@@ -137,4 +154,25 @@ def create_app(dedup_db_path: str | None = None) -> FastAPI:
             return app_state.events.events_by_topic.get(topic, [])
         return {t: len(v) for t, v in app_state.events.events_by_topic.items()}
 
+    @app.get("/debug/profile", response_class=PlainTextResponse)
+    async def debug_profile(
+        seconds: float = Query(5.0, gt=0),
+        format: str = Query("collapsed", pattern="^(collapsed|pstats)$"),
+    ):
+        # guarded: disabled unless DEBUG_PROFILE_ENABLED
+        if not global_settings.debug_profile_enabled:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+        if seconds > global_settings.debug_profile_max_seconds:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"seconds must be <= {global_settings.debug_profile_max_seconds}",
+            )
+        if app_state.profile_lock.locked():
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="profile already running")
+        async with app_state.profile_lock:
+            log.info("profiling %s for %.1fs", format, seconds)
+            if format == "pstats":
+                return await profile_pstats(seconds)
+            return await profile_collapsed(seconds)
+
     return app
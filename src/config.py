@@ -1,8 +1,15 @@
 import os
 from pydantic import BaseModel
 
+def _env_bool(name: str, default: str = "0") -> bool:
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
+
 # app settings
 class Settings(BaseModel):
     dedup_db_path: str = os.getenv("DEDUP_DB_PATH", "data/dedup.db")
+    loop_monitor_interval: float = float(os.getenv("LOOP_MONITOR_INTERVAL", "0.1"))
+    slow_callback_threshold: float = float(os.getenv("SLOW_CALLBACK_THRESHOLD", "0.1"))
+    debug_profile_enabled: bool = _env_bool("DEBUG_PROFILE_ENABLED")
+    debug_profile_max_seconds: float = float(os.getenv("DEBUG_PROFILE_MAX_SECONDS", "30"))
 
 settings = Settings()
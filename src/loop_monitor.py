@@ -0,0 +1,170 @@
+import asyncio
+import cProfile
+import io
+import logging
+import pstats
+import sys
+import threading
+import traceback
+from collections import Counter, deque
+from time import monotonic, perf_counter, sleep
+
+log = logging.getLogger("loop_monitor")  # dedicated logger
+
+# nearest-rank percentiles over samples
+# copy of scripts/aggregator_client.percentiles (src/ cannot import scripts/); keep in sync
+def percentiles(samples, ps) -> dict:
+    if not samples:
+        return {p: None for p in ps}
+    s = sorted(samples)
+    res = {}
+    for p in ps:
+        k = max(0, min(len(s) - 1, int(round(p / 100 * (len(s) - 1)))))
+        res[p] = s[k]
+    return res
+
+# collapsed stack line: outermost frame first, ';'-separated
+def _collapse(frame) -> str:
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+class LoopMonitor:
+    """Event-loop lag sampler and slow-callback watchdog.
+
+    A task on the loop sleeps ``interval`` seconds and records how late it
+    wakes up (lag). A watchdog thread checks the same heartbeat; when the
+    loop has not ticked for ``slow_threshold`` seconds it logs the stack the
+    loop thread is stuck in.
+    """
+
+    def __init__(self, interval: float = 0.1, slow_threshold: float = 0.1, window: int = 1000):
+        if interval <= 0 or slow_threshold <= 0:
+            raise ValueError("interval and slow_threshold must be > 0")
+        self.interval = interval
+        self.slow_threshold = slow_threshold
+        self.lag_samples: deque[float] = deque(maxlen=window)  # ms
+        self.max_lag_ms = 0.0
+        self.slow_callbacks = 0
+        self._heartbeat = monotonic()
+        self._loop_thread_id: int | None = None
+        self._task: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        # must be called from the running loop
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._sample_loop())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+        log.info("Loop monitor started (interval=%.3fs, slow_threshold=%.3fs).",
+                 self.interval, self.slow_threshold)
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            # join off-loop: the watchdog may be mid-poll or formatting a stack
+            await asyncio.to_thread(self._watchdog.join, 1.0)
+            self._watchdog = None
+
+    async def _sample_loop(self) -> None:
+        while True:
+            t0 = monotonic()
+            await asyncio.sleep(self.interval)
+            now = monotonic()
+            self._heartbeat = now
+            lag_ms = max(0.0, (now - t0 - self.interval) * 1000.0)
+            self.lag_samples.append(lag_ms)
+            if lag_ms > self.max_lag_ms:
+                self.max_lag_ms = lag_ms
+
+    def _watch(self) -> None:
+        # report each stall once, while it is still blocking
+        reported = False
+        poll = min(self.interval, self.slow_threshold) / 2
+        while not self._stop.wait(poll):
+            stalled = monotonic() - self._heartbeat - self.interval
+            if stalled < self.slow_threshold:
+                reported = False
+                continue
+            if reported:
+                continue
+            reported = True
+            self.slow_callbacks += 1
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "<unavailable>\n"
+            log.warning("event loop blocked for %.1f ms; loop thread stack:\n%s",
+                        stalled * 1000.0, stack)
+
+    def snapshot(self) -> dict:
+        # lag summary for /stats
+        p = percentiles(list(self.lag_samples), [50, 95, 99])
+        return {
+            "loop_lag_ms": {
+                "p50": _round(p[50]),
+                "p95": _round(p[95]),
+                "p99": _round(p[99]),
+                "max": round(self.max_lag_ms, 3),
+                "samples": len(self.lag_samples),
+            },
+            "slow_callbacks": self.slow_callbacks,
+        }
+
+def _round(v: float | None) -> float | None:
+    return None if v is None else round(v, 3)
+
+# sample stacks of a thread from a helper thread
+def _sample_stacks(thread_id: int, seconds: float, interval: float) -> tuple[Counter, int]:
+    stacks: Counter = Counter()
+    n = 0
+    deadline = perf_counter() + seconds
+    while perf_counter() < deadline:
+        frame = sys._current_frames().get(thread_id)
+        if frame is not None:
+            stacks[_collapse(frame)] += 1
+            n += 1
+        sleep(interval)
+    return stacks, n
+
+async def profile_collapsed(seconds: float, interval: float = 0.005) -> str:
+    """Sample the loop thread's stack for ``seconds``; return collapsed stacks.
+
+    Output is one ``frame;frame;... count`` line per distinct stack, suitable
+    for flamegraph.pl / speedscope.
+    """
+    loop_thread_id = threading.get_ident()
+    stacks, n = await asyncio.to_thread(_sample_stacks, loop_thread_id, seconds, interval)
+    lines = [f"{stack} {count}" for stack, count in stacks.most_common()]
+    log.info("profile collapsed: %d samples, %d distinct stacks", n, len(stacks))
+    return "\n".join(lines) + "\n"
+
+async def profile_pstats(seconds: float, sort: str = "cumulative", limit: int = 50) -> str:
+    """Run cProfile on the loop thread for ``seconds``; return a pstats report.
+
+    Every callback the loop runs meanwhile executes on this thread, so the
+    report covers all request handling and consumers, not only this coroutine.
+    """
+    prof = cProfile.Profile()
+    prof.enable()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        prof.disable()
+    out = io.StringIO()
+    pstats.Stats(prof, stream=out).sort_stats(sort).print_stats(limit)
+    return out.getvalue()
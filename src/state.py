@@ -26,6 +26,8 @@ class AppState:
         self.dedup = None
         self.consumer_tasks: list[asyncio.Task] = []
         self.fallback_db_path: str | None = None
+        self.loop_monitor = None
+        self.profile_lock = asyncio.Lock()  # one profile at a time
 
     def reset(self) -> None:
         # reset all runtime state
@@ -33,6 +35,7 @@ class AppState:
         self.stats = Stats()
         self.events = InMemoryEventStore()
         self.consumer_tasks = []
+        self.profile_lock = asyncio.Lock()
 
 # global app state
 app_state = AppState()
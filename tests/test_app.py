@@ -1,3 +1,5 @@
+import asyncio
+import logging
 import os
 import shutil
 import tempfile
@@ -150,4 +152,65 @@ def test_stress_small_with_dupes(make_client):
     assert s["received"] == N
     assert s["unique_processed"] == uniq
     assert s["duplicate_dropped"] == N - uniq
-    assert elapsed < 5.0  # batas wajar
\ No newline at end of file
+    assert elapsed < 5.0  # batas wajar
+
+def test_stats_loop_lag(make_client):
+    """Stats: persentil lag event loop tersedia."""
+    client, _ = make_client()
+    time.sleep(0.3)  # beri waktu sampler mengambil sampel
+    s = client.get("/stats").json()
+    lag = s["loop_lag_ms"]
+    assert lag["samples"] >= 1
+    assert lag["p50"] is not None and lag["p50"] <= lag["p99"] <= lag["max"]
+    assert s["slow_callbacks"] >= 0
+
+def test_slow_callback_detected(caplog):
+    """Watchdog mendeteksi callback yang memblokir event loop beserta stack-nya."""
+    from src.loop_monitor import LoopMonitor
+
+    async def run():
+        mon = LoopMonitor(interval=0.01, slow_threshold=0.05)
+        mon.start()
+        await asyncio.sleep(0.05)
+        time.sleep(0.2)  # blokir loop
+        await asyncio.sleep(0.05)
+        await mon.stop()
+        return mon
+
+    with caplog.at_level(logging.WARNING, logger="loop_monitor"):
+        mon = asyncio.run(run())
+    assert mon.slow_callbacks >= 1
+    assert mon.max_lag_ms >= 100.0
+    blocked = [r.getMessage() for r in caplog.records if "event loop blocked" in r.getMessage()]
+    assert blocked
+    assert "in run" in blocked[0] and "time.sleep(0.2)" in blocked[0]
+
+def test_loop_monitor_rejects_non_positive():
+    """LoopMonitor menolak interval/threshold <= 0 (watchdog tidak busy-spin)."""
+    from src.loop_monitor import LoopMonitor
+
+    with pytest.raises(ValueError):
+        LoopMonitor(interval=0)
+    with pytest.raises(ValueError):
+        LoopMonitor(slow_threshold=0)
+
+def test_debug_profile_guarded(make_client, monkeypatch):
+    """Endpoint profil nonaktif secara default, aktif lewat konfigurasi."""
+    from src.config import settings
+
+    client, _ = make_client()
+    r = client.get("/debug/profile", params={"seconds": 0.1})
+    assert r.status_code == 404
+
+    monkeypatch.setattr(settings, "debug_profile_enabled", True)
+    r = client.get("/debug/profile", params={"seconds": settings.debug_profile_max_seconds + 1})
+    assert r.status_code == 422
+
+    r = client.get("/debug/profile", params={"seconds": 0.2})
+    assert r.status_code == 200
+    assert r.text.strip()
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in r.text.strip().splitlines())
+
+    r = client.get("/debug/profile", params={"seconds": 0.2, "format": "pstats"})
+    assert r.status_code == 200
+    assert "function calls" in r.text
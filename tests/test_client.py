@@ -0,0 +1,186 @@
+import asyncio
+import json
+import logging
+import time
+import httpx
+import pytest
+from scripts.aggregator_client import AggregatorClient, PublishError, parse_retry_after
+
+def make_event(i):
+    return {
+        "topic": "t",
+        "event_id": f"id{i}",
+        "timestamp": "2025-10-24T00:00:00Z",
+        "source": "test",
+        "payload": {},
+    }
+
+# mock aggregator: replies from `statuses` in order (status code or exception), then 202
+def recording_transport(statuses=(), headers=None, delay=0.0):
+    seen = {"batches": [], "attempts": [], "in_flight": 0, "max_in_flight": 0}
+    replies = list(statuses)
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        seen["attempts"].append(time.perf_counter())
+        seen["in_flight"] += 1
+        seen["max_in_flight"] = max(seen["max_in_flight"], seen["in_flight"])
+        try:
+            await asyncio.sleep(delay)
+            code = replies.pop(0) if replies else 202
+            if isinstance(code, Exception):
+                raise code
+            if code == 202:
+                seen["batches"].append(json.loads(request.content)["events"])
+            return httpx.Response(code, headers=headers or {}, json={"enqueued": 0})
+        finally:
+            seen["in_flight"] -= 1
+    return httpx.MockTransport(handler), seen
+
+def test_client_batches_by_size_and_linger():
+    """Client: batch penuh dikirim segera, sisa dikirim setelah linger."""
+    transport, seen = recording_transport()
+
+    async def run():
+        async with AggregatorClient(batch_size=4, linger=0.05, transport=transport) as c:
+            await c.publish_many(make_event(i) for i in range(10))
+            await asyncio.sleep(0.01)
+            assert [len(b) for b in seen["batches"]] == [4, 4]  # sisa 2 masih linger
+            await asyncio.sleep(0.1)
+            assert [len(b) for b in seen["batches"]] == [4, 4, 2]
+            return c.stats
+
+    stats = asyncio.run(run())
+    assert stats.events_sent == 10 and stats.batches_sent == 3
+
+def test_client_bounded_in_flight():
+    """Client: jumlah request bersamaan tidak melebihi max_in_flight."""
+    transport, seen = recording_transport(delay=0.02)
+
+    async def run():
+        async with AggregatorClient(batch_size=1, max_in_flight=3, transport=transport) as c:
+            await c.publish_many(make_event(i) for i in range(12))
+
+    asyncio.run(run())
+    assert seen["max_in_flight"] == 3
+    assert len(seen["batches"]) == 12
+
+def test_client_publish_waits_for_lingered_batch():
+    """Client: publish() ikut menunggu saat batch dari linger menunggu slot."""
+    transport, seen = recording_transport(delay=0.3)
+
+    async def run():
+        async with AggregatorClient(batch_size=100, linger=0.01, max_in_flight=1, transport=transport) as c:
+            await c.publish(make_event(0))
+            await asyncio.sleep(0.03)  # batch 1 terkirim (slot penuh)
+            await c.publish(make_event(1))
+            await asyncio.sleep(0.03)  # linger batch 2 menunggu slot
+            t0 = time.perf_counter()
+            await c.publish(make_event(2))
+            waited = time.perf_counter() - t0
+            assert len(c._in_flight) <= 2
+            return waited
+
+    waited = asyncio.run(run())
+    assert waited >= 0.15
+    assert [len(b) for b in seen["batches"]] == [1, 1, 1]
+
+def test_client_retry_after_holds_all_batches():
+    """Client: Retry-After dari satu batch menahan batch lain yang bersamaan."""
+    transport, seen = recording_transport(statuses=[429], headers={"Retry-After": "0.3"})
+
+    async def run():
+        async with AggregatorClient(batch_size=1, max_in_flight=2, backoff_base=0.001, transport=transport) as c:
+            await c.publish(make_event(0))
+            await asyncio.sleep(0.05)  # 429 sudah diterima
+            await c.publish(make_event(1))
+            return c.stats
+
+    stats = asyncio.run(run())
+    assert stats.throttled == 1 and stats.failed_batches == 0
+    first, later = seen["attempts"][0], seen["attempts"][1:]
+    assert len(later) == 2 and all(t - first >= 0.28 for t in later)
+
+def test_client_retries_transient_and_throttle():
+    """Client: 503/429 di-retry (Retry-After dihormati) hingga sukses."""
+    transport, seen = recording_transport(statuses=[503, 429], headers={"Retry-After": "0.2"})
+
+    async def run():
+        async with AggregatorClient(batch_size=2, backoff_base=0.001, transport=transport) as c:
+            await c.publish_many(make_event(i) for i in range(2))
+            return c.stats
+
+    stats = asyncio.run(run())
+    assert stats.retries == 2 and stats.throttled == 1
+    assert len(seen["batches"]) == 1
+    # jitter backoff (base 1 ms) would retry almost immediately
+    gaps = [b - a for a, b in zip(seen["attempts"], seen["attempts"][1:])]
+    assert len(gaps) == 2 and all(g >= 0.18 for g in gaps)
+
+def test_client_retries_transport_error():
+    """Client: error koneksi di-retry dengan backoff hingga sukses."""
+    req = httpx.Request("POST", "http://test/publish")
+    transport, seen = recording_transport(statuses=[httpx.ConnectError("refused", request=req)])
+
+    async def run():
+        async with AggregatorClient(batch_size=1, backoff_base=0.001, transport=transport) as c:
+            await c.publish(make_event(0))
+            return c.stats
+
+    stats = asyncio.run(run())
+    assert stats.retries == 1 and stats.failed_batches == 0
+    assert len(seen["attempts"]) == 2 and len(seen["batches"]) == 1
+
+def test_client_accepts_non_json_body():
+    """Client: 2xx tanpa body JSON tetap dihitung terkirim, bukan gagal."""
+    transport = httpx.MockTransport(lambda request: httpx.Response(202, content=b""))
+
+    async def run():
+        async with AggregatorClient(batch_size=1, transport=transport) as c:
+            assert await c.send_batch([make_event(0)]) == {}
+            await c.publish(make_event(1))
+            return c.stats
+
+    stats = asyncio.run(run())
+    assert stats.batches_sent == 2 and stats.failed_batches == 0
+
+def test_client_logs_discarded_on_error(caplog):
+    """Client: keluar dari async with karena exception mencatat event yang dibuang."""
+
+    clients = []
+
+    async def run():
+        async with AggregatorClient(batch_size=10, linger=0.01, max_in_flight=1, transport=transport) as c:
+            clients.append(c)
+            await c.publish_many(make_event(i) for i in range(10))  # batch penuh, sedang dikirim
+            await c.publish(make_event(10))
+            await asyncio.sleep(0.03)  # linger batch menunggu slot
+            raise RuntimeError("boom")
+
+    transport, seen = recording_transport(delay=1.0)
+    with caplog.at_level(logging.WARNING, logger="aggregator_client"), pytest.raises(RuntimeError):
+        asyncio.run(run())
+    assert not seen["batches"]
+    assert any("discarding 11 undelivered events" in r.getMessage() for r in caplog.records)
+    c = clients[0]
+    assert c._pending_events == 0 and not c._in_flight
+
+def test_client_gives_up_and_reports():
+    """Client: 4xx tidak di-retry; retry habis dilaporkan sebagai PublishError."""
+    async def run(statuses, **kw):
+        transport, _ = recording_transport(statuses=statuses)
+        async with AggregatorClient(batch_size=1, backoff_base=0.001, transport=transport, **kw) as c:
+            await c.publish(make_event(0))
+
+    with pytest.raises(PublishError) as exc:
+        asyncio.run(run([422]))
+    assert len(exc.value.batch) == 1
+    with pytest.raises(PublishError):
+        asyncio.run(run([500, 500, 500], max_retries=2))
+
+def test_parse_retry_after():
+    """Retry-After: detik atau HTTP-date, dibatasi."""
+    assert parse_retry_after("2") == 2.0
+    assert parse_retry_after("99999") == 60.0
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert parse_retry_after("garbage") is None
+    assert parse_retry_after(None) is None